@@ -22,9 +22,19 @@ if _env_path.exists():
 AXIOM_API_TOKEN: str = os.getenv("AXIOM_API_TOKEN", "")
 AXIOM_DATASET: str = os.getenv("AXIOM_DATASET", "audimeta")
 AXIOM_API_URL: str = "https://api.axiom.co/v1/datasets/_apl?format=tabular"
+AXIOM_CACHE_TTL: int = int(os.getenv("AXIOM_CACHE_TTL", "30"))  # seconds
 
 # ── Geolocation ─────────────────────────────────────────────
 MAXMIND_DB_PATH: str = os.getenv("MAXMIND_DB_PATH", "./backend/data/GeoLite2-City.mmdb")
+# How maxminddb opens the DB: MMAP_EXT (libmaxminddb C extension, fastest
+# lookups, default), or the pure-Python readers MEMORY (whole file in RAM,
+# ~70 MB, no disk reads but slower decoding), MMAP, FILE. AUTO picks the
+# C extension when available.
+MAXMIND_MODE: str = os.getenv("MAXMIND_MODE", "MMAP_EXT").upper()
+# Used when no MaxMind DB is loaded: "ipwho" (ipwho.is over HTTPS, one
+# request per IP, default) or "ip-api" (ip-api.com batch API, 100 IPs per
+# request, but the free tier is plain HTTP — visitor IPs are sent unencrypted)
+GEO_FALLBACK: str = os.getenv("GEO_FALLBACK", "ipwho").lower()
 
 # ── Google Maps ─────────────────────────────────────────────
 GOOGLE_MAPS_API_KEY: str = os.getenv("GOOGLE_MAPS_API_KEY", "")
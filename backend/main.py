@@ -6,9 +6,13 @@ This is the entrypoint uvicorn loads:
 """
 
 import logging
+from contextlib import asynccontextmanager
 
+import httpx
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from backend.config import FRONTEND_DIR
@@ -22,8 +26,32 @@ logging.basicConfig(
     datefmt="%H:%M:%S",
 )
 
+# ── Lifespan ────────────────────────────────────────────────
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    One shared HTTP client for the app's lifetime.
+
+    Reusing the client keeps connections to Axiom (and the geolocation
+    fallback) alive between requests instead of paying a fresh TCP+TLS
+    handshake on every call. HTTP/2 lets concurrent Axiom queries share
+    a single connection.
+    """
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=httpx.Timeout(30.0, connect=5.0),
+        limits=httpx.Limits(max_keepalive_connections=10, max_connections=20, keepalive_expiry=60),
+    )
+    yield
+    await app.state.http.aclose()
+
+
 # ── App ─────────────────────────────────────────────────────
-app = FastAPI(title="Axiom Geo Dashboard")
+app = FastAPI(
+    title="Axiom Geo Dashboard",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -32,6 +60,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Geodata JSON repeats the same keys hundreds of times — compresses well
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # ── Routes ──────────────────────────────────────────────────
 app.include_router(api_router)
 app.include_router(frontend_router)
@@ -3,22 +3,49 @@ Frontend Routes — serves the HTML shell, PWA files, and static assets.
 
 The main index.html has a placeholder __GOOGLE_MAPS_API_KEY__ that gets
 replaced at serve time so the key stays in environment variables only.
+The substituted page is built once and cached, with an ETag so browsers
+can revalidate with a 304 instead of re-downloading it.
 """
 
-from fastapi import APIRouter
-from fastapi.responses import FileResponse, HTMLResponse
+import functools
+import hashlib
+
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import FileResponse
 
 from backend.config import FRONTEND_DIR, GOOGLE_MAPS_API_KEY
 
 router = APIRouter()
 
 
+@functools.cache
+def _index_html() -> tuple[bytes, str]:
+    """index.html with the API key injected, plus its ETag. Built on first use."""
+    html = (FRONTEND_DIR / "index.html").read_text()
+    body = html.replace("__GOOGLE_MAPS_API_KEY__", GOOGLE_MAPS_API_KEY).encode()
+    return body, f'"{hashlib.md5(body).hexdigest()}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Weak comparison per RFC 9110: handles "*", comma-separated lists and
+    W/ prefixes (proxies like nginx weaken ETags when they gzip).
+    """
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
 @router.get("/")
-async def serve_index():
+async def serve_index(request: Request):
     """Serve frontend with Google Maps API key injected."""
-    html = (FRONTEND_DIR / "index.html").read_text()
-    html = html.replace("__GOOGLE_MAPS_API_KEY__", GOOGLE_MAPS_API_KEY)
-    return HTMLResponse(html)
+    body, etag = _index_html()
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="text/html", headers=headers)
 
 
 @router.get("/manifest.json")
@@ -4,28 +4,91 @@ Axiom API Client
 Handles all communication with the Axiom APL query API.
 APL (Axiom Processing Language) is pipe-based, similar to KQL.
 
-Two responsibilities:
+Three responsibilities:
 1. Execute APL queries against the Axiom API
 2. Parse Axiom's columnar response format into row dicts
+3. Cache results briefly so dashboard polling doesn't re-run every query
 """
 
 import asyncio
 import logging
 from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable
 
 import httpx
+import orjson
+from cachetools import TTLCache
 
-from backend.config import AXIOM_API_TOKEN, AXIOM_DATASET, AXIOM_API_URL
+from backend.config import AXIOM_API_TOKEN, AXIOM_CACHE_TTL, AXIOM_DATASET, AXIOM_API_URL
 
 logger = logging.getLogger(__name__)
 
+# ── APL queries ─────────────────────────────────────────────
+# Dataset is filled in once here; only {hours} is substituted per query.
+
+_APL_IP_COUNTS = f"""
+    ['{AXIOM_DATASET}']
+    | where _time >= ago({{hours}}h)
+    | where isnotnull(ip) and ip != ""
+    | summarize request_count = count() by ip
+    | order by request_count desc
+    | take 500
+    """
+
+_APL_ENDPOINTS = f"""
+    ['{AXIOM_DATASET}']
+    | where _time >= ago({{hours}}h)
+    | summarize hits = count() by url
+    | order by hits desc
+    | take 20
+    """
+
+_APL_STATUSES = f"""
+    ['{AXIOM_DATASET}']
+    | where _time >= ago({{hours}}h)
+    | where isnotnull(status)
+    | summarize count = count() by status
+    | order by count desc
+    """
+
+# ── Result cache ────────────────────────────────────────────
+
+_cache: TTLCache = TTLCache(maxsize=64, ttl=AXIOM_CACHE_TTL)
+_inflight: dict[tuple, asyncio.Task] = {}
+
+
+async def _cached(key: tuple, fetch: Callable[[], Awaitable]):
+    """
+    Return a cached result for key, or run fetch() to produce one.
+
+    Single-flight: concurrent callers for the same key share one
+    in-flight query instead of each sending their own.
+    """
+    if key in _cache:
+        return _cache[key]
+
+    task = _inflight.get(key)
+    if task is None:
+        async def run():
+            try:
+                result = await fetch()
+                _cache[key] = result
+                return result
+            finally:
+                _inflight.pop(key, None)
+
+        task = _inflight[key] = asyncio.create_task(run())
+
+    # Shield so one caller disconnecting doesn't cancel the shared query
+    return await asyncio.shield(task)
+
 
 def _time_range(hours: int) -> dict:
     """Build the time range dict Axiom expects."""
     now = datetime.now(timezone.utc)
     return {
-        "startTime": (now - timedelta(hours=hours)).isoformat(),
-        "endTime": now.isoformat(),
+        "startTime": (now - timedelta(hours=hours)).isoformat(timespec="seconds"),
+        "endTime": now.isoformat(timespec="seconds"),
     }
 
 
@@ -52,86 +115,54 @@ def parse_tabular_response(data: dict) -> list[dict]:
         return []
 
     table = tables[0]
-    fields = [f["name"] for f in table.get("fields", [])]
+    fields = tuple(f["name"] for f in table.get("fields", []))
     columns = table.get("columns", [])
 
     if not columns or not fields:
         return []
 
-    num_rows = len(columns[0])
-    return [
-        {fields[j]: columns[j][i] for j in range(len(fields))}
-        for i in range(num_rows)
-    ]
+    # zip(*columns) transposes columns → rows in C, no per-cell indexing
+    return [dict(zip(fields, row)) for row in zip(*columns)]
+
 
+async def _post_and_parse(client: httpx.AsyncClient, apl: str, time: dict) -> list[dict]:
+    """Run one APL query and parse the tabular response into row dicts."""
+    resp = await client.post(
+        AXIOM_API_URL,
+        headers=_headers(),
+        json={"apl": apl, **time},
+    )
+    resp.raise_for_status()
+    return parse_tabular_response(orjson.loads(resp.content))
 
-async def query_ip_counts(hours: int = 24) -> list[dict]:
+
+async def query_ip_counts(client: httpx.AsyncClient, hours: int = 24) -> list[dict]:
     """
     Get IP request counts for the last N hours.
 
     Returns: [{"ip": "1.2.3.4", "request_count": 100}, ...]
     """
-    apl = f"""
-    ['{AXIOM_DATASET}']
-    | where _time >= ago({hours}h)
-    | where isnotnull(ip) and ip != ""
-    | summarize request_count = count() by ip
-    | order by request_count desc
-    | take 500
-    """
-
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(
-            AXIOM_API_URL,
-            headers=_headers(),
-            json={"apl": apl, **_time_range(hours)},
-            timeout=30.0,
-        )
-        resp.raise_for_status()
-        return parse_tabular_response(resp.json())
+    return await _cached(
+        ("ip_counts", hours),
+        lambda: _post_and_parse(client, _APL_IP_COUNTS.format(hours=hours), _time_range(hours)),
+    )
 
 
-async def query_stats(hours: int = 24) -> dict:
+async def query_stats(client: httpx.AsyncClient, hours: int = 24) -> dict:
     """
     Get endpoint and status code stats for the last N hours.
 
     Returns: {"top_endpoints": [...], "status_codes": [...]}
     """
-    apl_endpoints = f"""
-    ['{AXIOM_DATASET}']
-    | where _time >= ago({hours}h)
-    | summarize hits = count() by url
-    | order by hits desc
-    | take 20
-    """
-
-    apl_statuses = f"""
-    ['{AXIOM_DATASET}']
-    | where _time >= ago({hours}h)
-    | where isnotnull(status)
-    | summarize count = count() by status
-    | order by count desc
-    """
-
-    time = _time_range(hours)
-
-    async with httpx.AsyncClient() as client:
-        ep_resp, st_resp = await asyncio.gather(
-            client.post(
-                AXIOM_API_URL,
-                headers=_headers(),
-                json={"apl": apl_endpoints, **time},
-                timeout=30.0,
-            ),
-            client.post(
-                AXIOM_API_URL,
-                headers=_headers(),
-                json={"apl": apl_statuses, **time},
-                timeout=30.0,
-            ),
+    async def fetch() -> dict:
+        time = _time_range(hours)
+        top_endpoints, status_codes = await asyncio.gather(
+            _post_and_parse(client, _APL_ENDPOINTS.format(hours=hours), time),
+            _post_and_parse(client, _APL_STATUSES.format(hours=hours), time),
         )
+        return {
+            "top_endpoints": top_endpoints,
+            "status_codes": status_codes,
+        }
 
-    return {
-        "top_endpoints": parse_tabular_response(ep_resp.json()),
-        "status_codes": parse_tabular_response(st_resp.json()),
-    }
+    return await _cached(("stats", hours), fetch)
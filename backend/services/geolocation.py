@@ -1,74 +1,188 @@
 """
 IP Geolocation Service
 
-Strategy pattern: tries MaxMind local DB first, falls back to ipwho.is.
+Strategy pattern: tries MaxMind local DB first, falls back to a web API
+(ipwho.is by default, ip-api.com if GEO_FALLBACK=ip-api).
 The rest of the app only calls geocode_ips() and doesn't care which
 method is used underneath.
 
-MaxMind:  microsecond lookups, no network, no rate limits
-ipwho.is: free HTTPS API, no key required, ~200ms per lookup
+MaxMind:    microsecond lookups, no network, no rate limits
+ipwho.is:   free HTTPS API, no key required, one request per IP
+ip-api.com: free batch API, 100 IPs per request, plain HTTP only (opt-in)
 """
 
 import asyncio
+import functools
 import logging
+import threading
+import time
 from pathlib import Path
 from typing import Optional
 
 import httpx
+import orjson
+from aiolimiter import AsyncLimiter
+from cachetools import TTLCache
 
-from backend.config import MAXMIND_DB_PATH
+from backend.config import GEO_FALLBACK, MAXMIND_DB_PATH, MAXMIND_MODE
 
 logger = logging.getLogger(__name__)
 
-# ── MaxMind reader (loaded once at import time) ─────────────
+# ── MaxMind reader (loaded at import, reloaded if the file changes) ─
 
 _geoip_reader = None
+_geoip_mtime: Optional[float] = None
+_geoip_checked_at = 0.0
+_geoip_reload_lock = threading.Lock()
 
+MAXMIND_CHECK_INTERVAL = 60  # seconds between mtime checks on the .mmdb
 
-def _init_maxmind():
-    """Try to load the MaxMind database. Sets module-level reader or None."""
-    global _geoip_reader
-    db_path = Path(MAXMIND_DB_PATH)
-    if db_path.exists():
-        import geoip2.database
-        _geoip_reader = geoip2.database.Reader(str(db_path))
-        logger.info(f"✓ MaxMind GeoLite2 loaded from {db_path}")
+# MAXMIND_MODE values we accept. MODE_FD is left out on purpose: it
+# expects a file descriptor, not the path we pass.
+MAXMIND_MODES = ("MMAP_EXT", "MMAP", "FILE", "MEMORY", "AUTO")
+
+# ── Web API fallbacks ───────────────────────────────────────
+
+# Fallback lookups, so repeat IPs never hit the network twice. IPs the
+# provider rejects (private/reserved ranges, invalid) are cached as None;
+# network errors aren't cached so they get retried. Bounded like the
+# MaxMind lru_cache; entries expire after a day so answers can refresh.
+FALLBACK_CACHE_TTL = 24 * 60 * 60  # seconds
+_fallback_cache: TTLCache = TTLCache(maxsize=100_000, ttl=FALLBACK_CACHE_TTL)
+_NOT_CACHED = object()
+
+# Rate limits are shared across requests so concurrent dashboards
+# stay under the same limit.
+
+# ipwho.is (default): up to 8 lookups in flight, at most 10 started per second
+_ipwho_limiter = AsyncLimiter(10, 1.0)
+_ipwho_semaphore = asyncio.Semaphore(8)
+
+# ip-api.com (opt-in): the free tier is HTTP-only, so IPs travel unencrypted
+IPAPI_BATCH_URL = "http://ip-api.com/batch?fields=status,message,query,lat,lon,city,country,countryCode"
+IPAPI_BATCH_SIZE = 100  # max IPs per batch request
+_ipapi_limiter = AsyncLimiter(15, 60.0)  # 15 batch requests per minute
+
+if GEO_FALLBACK not in ("ipwho", "ip-api"):
+    logger.warning(f"⚠ Unknown GEO_FALLBACK {GEO_FALLBACK!r}, using ipwho")
+
+
+def _db_mtime() -> Optional[float]:
+    """Modification time of the MaxMind DB, or None if it doesn't exist."""
+    try:
+        return Path(MAXMIND_DB_PATH).stat().st_mtime
+    except OSError:
+        return None
+
+
+def _has_maxmind_extension() -> bool:
+    """Whether maxminddb's libmaxminddb C extension could be imported."""
+    try:
+        from maxminddb import extension
+    except ImportError:
+        return False
+    return hasattr(extension, "Reader")
+
+
+def _open_maxmind(db_path: Path):
+    """Open the MaxMind database. Raises if the file can't be read."""
+    import maxminddb
+    if MAXMIND_MODE in MAXMIND_MODES:
+        mode = getattr(maxminddb, f"MODE_{MAXMIND_MODE}")
     else:
-        logger.warning(f"⚠ MaxMind DB not found at {db_path}, using ipwho.is fallback")
+        logger.warning(f"⚠ Unknown MAXMIND_MODE {MAXMIND_MODE!r}, using MMAP_EXT")
+        mode = maxminddb.MODE_MMAP_EXT
+    if mode == maxminddb.MODE_MMAP_EXT and not _has_maxmind_extension():
+        # e.g. pip built maxminddb from source without a compiler
+        logger.warning("⚠ maxminddb C extension not available, using pure-Python reader")
+        mode = maxminddb.MODE_AUTO
+    return maxminddb.open_database(str(db_path), mode)
+
+
+def _refresh_maxmind(force: bool = False):
+    """
+    (Re)load the MaxMind database if its file changed.
+
+    Stats the file at most once per interval. Blocking — called from a
+    worker thread, never on the event loop. If the new file can't be
+    opened the current reader is kept and the open is retried on the
+    next check.
+    """
+    global _geoip_reader, _geoip_mtime, _geoip_checked_at
+    if not _geoip_reload_lock.acquire(blocking=False):
+        return  # another thread is already checking
+    try:
+        if not force and time.monotonic() - _geoip_checked_at < MAXMIND_CHECK_INTERVAL:
+            return
+        _geoip_checked_at = time.monotonic()
+
+        mtime = _db_mtime()
+        if mtime == _geoip_mtime and not force:
+            return
 
+        db_path = Path(MAXMIND_DB_PATH)
+        if mtime is None:
+            reader = None
+            logger.warning(f"⚠ MaxMind DB not found at {db_path}, using web API fallback")
+        else:
+            try:
+                reader = _open_maxmind(db_path)
+            except Exception as e:
+                logger.error(f"✗ Failed to load MaxMind DB from {db_path}: {e}")
+                return
+            logger.info(f"✓ MaxMind GeoLite2 loaded from {db_path} ({MAXMIND_MODE})")
 
-_init_maxmind()
+        _geoip_reader = reader
+        _geoip_mtime = mtime
+        # Cached lookups came from the previous DB (or none at all)
+        _lookup_maxmind.cache_clear()
+    finally:
+        _geoip_reload_lock.release()
 
 
 # ── Lookup implementations ──────────────────────────────────
 
-def _lookup_maxmind(ip: str) -> Optional[dict]:
-    """Local MaxMind database lookup. Microsecond-fast."""
-    if not _geoip_reader:
-        return None
+@functools.lru_cache(maxsize=100_000)
+def _lookup_maxmind(reader, ip: str) -> Optional[dict]:
+    """
+    Local MaxMind database lookup. Microsecond-fast, cached per IP.
+
+    Keyed on the reader too, so a lookup that finishes on the old reader
+    after a reload can never be served as a result from the new one.
+    """
     try:
-        resp = _geoip_reader.city(ip)
-        if resp.location.latitude and resp.location.longitude:
+        # Raw record dict — skips building geoip2 model objects per lookup
+        rec = reader.get(ip)
+        if not rec:
+            return None
+        location = rec.get("location", {})
+        country = rec.get("country", {})
+        lat, lng = location.get("latitude"), location.get("longitude")
+        if lat and lng:
             return {
                 "ip": ip,
-                "lat": resp.location.latitude,
-                "lng": resp.location.longitude,
-                "city": resp.city.name or "Unknown",
-                "country": resp.country.name or "Unknown",
-                "country_code": resp.country.iso_code or "??",
+                "lat": lat,
+                "lng": lng,
+                "city": rec.get("city", {}).get("names", {}).get("en") or "Unknown",
+                "country": country.get("names", {}).get("en") or "Unknown",
+                "country_code": country.get("iso_code") or "??",
             }
     except Exception:
         pass
     return None
 
 
+_refresh_maxmind(force=True)
+
+
 async def _lookup_ipwho(ip: str, client: httpx.AsyncClient) -> Optional[dict]:
     """Fallback: HTTPS geolocation via ipwho.is. Free, no API key."""
     try:
-        resp = await client.get(f"https://ipwho.is/{ip}", timeout=5.0)
-        data = resp.json()
+        async with _ipwho_semaphore, _ipwho_limiter:
+            resp = await client.get(f"https://ipwho.is/{ip}", timeout=5.0)
+        data = orjson.loads(resp.content)
         if data.get("success", False):
-            return {
+            result = {
                 "ip": ip,
                 "lat": data["latitude"],
                 "lng": data["longitude"],
@@ -76,34 +190,99 @@ async def _lookup_ipwho(ip: str, client: httpx.AsyncClient) -> Optional[dict]:
                 "country": data.get("country", "Unknown"),
                 "country_code": data.get("country_code", "??"),
             }
+            _fallback_cache[ip] = result
+            return result
         else:
+            _fallback_cache[ip] = None
             logger.warning(f"Geolocation failed for {ip}: {data.get('message', 'unknown')}")
     except Exception as e:
         logger.warning(f"Geolocation error for {ip}: {e}")
     return None
 
 
+async def _lookup_ipapi(ips: list[str], client: httpx.AsyncClient) -> list[dict]:
+    """Opt-in fallback: geolocate up to IPAPI_BATCH_SIZE IPs in one ip-api.com request."""
+    results = []
+    try:
+        async with _ipapi_limiter:
+            resp = await client.post(IPAPI_BATCH_URL, json=ips, timeout=10.0)
+        resp.raise_for_status()
+        for data in orjson.loads(resp.content):
+            ip = data.get("query")
+            if data.get("status") == "success":
+                result = {
+                    "ip": ip,
+                    "lat": data["lat"],
+                    "lng": data["lon"],
+                    "city": data.get("city") or "Unknown",
+                    "country": data.get("country") or "Unknown",
+                    "country_code": data.get("countryCode") or "??",
+                }
+                _fallback_cache[ip] = result
+                results.append(result)
+            else:
+                _fallback_cache[ip] = None
+                logger.warning(f"Geolocation failed for {ip}: {data.get('message', 'unknown')}")
+    except Exception as e:
+        logger.warning(f"Geolocation error for batch of {len(ips)} IPs: {e}")
+    return results
+
+
+def _batch_maxmind(ips: list[str]) -> Optional[list[dict]]:
+    """
+    Look up a batch of IPs in MaxMind, or None if no DB is loaded.
+
+    Blocking — run it off the event loop. Also runs the reload check,
+    so stat-ing and opening the DB never happen on the loop either.
+    """
+    _refresh_maxmind()
+    reader = _geoip_reader
+    if not reader:
+        return None
+
+    results = []
+    for ip in ips:
+        result = _lookup_maxmind(reader, ip)
+        if result:
+            results.append(result)
+
+    # DB was swapped mid-batch: drop the entries we cached against the
+    # old reader so they don't keep it alive in the LRU
+    if reader is not _geoip_reader:
+        _lookup_maxmind.cache_clear()
+    return results
+
+
 # ── Public interface ────────────────────────────────────────
 
-async def geocode_ips(ips: list[str]) -> list[dict]:
+async def geocode_ips(ips: list[str], client: httpx.AsyncClient) -> list[dict]:
     """
-    Geocode a list of IPs. Uses MaxMind if available, otherwise ipwho.is.
+    Geocode a list of IPs. Uses MaxMind if available, otherwise the
+    configured web API fallback.
 
     This is the only function the rest of the app should call.
     """
+    # One worker thread for the whole batch keeps the DB reads
+    # from stalling other requests on the event loop
+    results = await asyncio.to_thread(_batch_maxmind, ips)
+    if results is not None:
+        return results
+
     results = []
+    missing = []
+    for ip in ips:
+        cached = _fallback_cache.get(ip, _NOT_CACHED)
+        if cached is _NOT_CACHED:
+            missing.append(ip)
+        elif cached:
+            results.append(cached)
 
-    if _geoip_reader:
-        for ip in ips:
-            result = _lookup_maxmind(ip)
-            if result:
-                results.append(result)
+    if GEO_FALLBACK == "ip-api":
+        chunks = [missing[i:i + IPAPI_BATCH_SIZE] for i in range(0, len(missing), IPAPI_BATCH_SIZE)]
+        for batch in await asyncio.gather(*(_lookup_ipapi(chunk, client) for chunk in chunks)):
+            results.extend(batch)
     else:
-        async with httpx.AsyncClient() as client:
-            for ip in ips:
-                result = await _lookup_ipwho(ip, client)
-                if result:
-                    results.append(result)
-                await asyncio.sleep(0.1)  # Courtesy delay
+        found = await asyncio.gather(*(_lookup_ipwho(ip, client) for ip in missing))
+        results.extend(r for r in found if r)
 
     return results